@@ -0,0 +1,62 @@
+"""Application settings for the Azure OpenAI Sora service."""
+
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from pydantic import BaseModel
+
+
+class Settings(BaseModel):
+    """Application settings sourced from environment variables."""
+
+    # Credentials are optional at startup so endpoints that never touch
+    # Azure (e.g. /health) work without them; the service raises on first use.
+    azure_openai_api_key: str | None = None
+    azure_openai_endpoint: str | None = None
+    azure_openai_api_version: str = "2024-08-01-preview"
+    # Optional shared job store; when unset, jobs live in process memory
+    # and /status only works against the worker that accepted the job
+    redis_url: str | None = None
+    max_stored_jobs: int = 50
+    max_concurrent_jobs: int = 8
+    max_queued_jobs: int = 64
+    job_cleanup_interval: float = 60.0
+    job_ttl_seconds: float = 3600.0
+
+
+@lru_cache
+def _load_env_file(path: str = ".env") -> dict[str, str]:
+    """Parse a .env file once and cache the key/value pairs."""
+    values: dict[str, str] = {}
+    try:
+        lines = Path(path).read_text().splitlines()
+    except OSError:
+        return values
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, _, value = line.partition("=")
+        values[key.strip()] = value.strip().strip("'\"")
+    return values
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Return the application settings, built once and cached."""
+    # Process environment takes precedence over the .env file
+    env = {**_load_env_file(), **os.environ}
+    return Settings(
+        azure_openai_api_key=env.get("AZURE_OPENAI_API_KEY") or None,
+        azure_openai_endpoint=env.get("AZURE_OPENAI_ENDPOINT") or None,
+        azure_openai_api_version=env.get(
+            "AZURE_OPENAI_API_VERSION", "2024-08-01-preview"
+        ),
+        redis_url=env.get("REDIS_URL") or None,
+        max_stored_jobs=int(env.get("MAX_STORED_JOBS", "50")),
+        max_concurrent_jobs=int(env.get("MAX_CONCURRENT_JOBS", "8")),
+        max_queued_jobs=int(env.get("MAX_QUEUED_JOBS", "64")),
+        job_cleanup_interval=float(env.get("JOB_CLEANUP_INTERVAL", "60")),
+        job_ttl_seconds=float(env.get("JOB_TTL_SECONDS", "3600")),
+    )
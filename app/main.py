@@ -1,34 +1,60 @@
 """FastAPI application for Azure OpenAI Sora video generation."""
 
+import logging
 from contextlib import asynccontextmanager
-
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from dataclasses import asdict
+from pathlib import Path
+
+from fastapi import (
+    Depends,
+    FastAPI,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 
-from .models import VideoGenerationRequest, VideoStatus
-from .services.azure_openai import AzureOpenAIService
+from .models import (
+    HealthStatus,
+    VideoGenerationRequest,
+    VideoGenerationResponse,
+    VideoStatus,
+)
+from .services.azure_openai import AzureOpenAIService, JobQueueFullError
 
-# Global service instance
-azure_service = None
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Resolve filesystem paths once at import so serving doesn't depend on
+# the process working directory.
+BASE_DIR = Path(__file__).resolve().parent.parent
+STATIC_DIR = BASE_DIR / "static"
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler for startup and shutdown."""
-    # Startup
-    global azure_service
-    azure_service = AzureOpenAIService()
-    print("Starting Azure OpenAI Sora Web Server...")
+    # Startup: build the service, then create its loop-bound resources
+    # (HTTP client, cleanup task) on the running event loop
+    service = AzureOpenAIService()
+    await service.startup()
+    app.state.azure_service = service
+    logger.info("Starting Azure OpenAI Sora Web Server...")
 
     yield
 
-    # Shutdown
-    print("Shutting down Azure OpenAI Sora Web Server...")
-    # Clean up any pending tasks
-    if azure_service:
-        azure_service.cleanup_old_jobs()
-    print("Cleanup completed.")
+    # Shutdown: cancel background work and close the shared HTTP client
+    logger.info("Shutting down Azure OpenAI Sora Web Server...")
+    await service.shutdown()
+    logger.info("Cleanup completed.")
+
+
+def get_azure_service(request: Request) -> AzureOpenAIService:
+    """Return the lifespan-scoped Azure OpenAI service."""
+    return request.app.state.azure_service
 
 
 # Create FastAPI app with lifespan handler
@@ -40,38 +66,87 @@ app = FastAPI(
 )
 
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+
+# The index page is static; read it once instead of per request
+_INDEX_HTML = (STATIC_DIR / "index.html").read_text()
 
 
 @app.get("/")
 async def root():
     """Serve the main web interface."""
-    return FileResponse("static/index.html")
+    return HTMLResponse(_INDEX_HTML)
 
 
-@app.post("/generate", response_model=dict)
-async def generate_video(request: VideoGenerationRequest):
+@app.post("/generate", response_model=VideoGenerationResponse)
+async def generate_video(
+    request: VideoGenerationRequest,
+    azure_service: AzureOpenAIService = Depends(get_azure_service),
+):
     """Generate a video using Azure OpenAI Sora."""
     try:
         video_id = await azure_service.generate_video(request)
-        return {"video_id": video_id, "status": "pending"}
+        return VideoGenerationResponse(video_id=video_id, status="pending")
+    except JobQueueFullError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "30"}
+        ) from e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
 @app.get("/status/{video_id}", response_model=VideoStatus)
-async def get_video_status(video_id: str):
-    """Get the status of a video generation job."""
-    status = azure_service.get_video_status(video_id)
+async def get_video_status(
+    video_id: str,
+    wait: float = Query(
+        default=0,
+        ge=0,
+        le=60,
+        description="Long-poll: seconds to wait for a status change",
+    ),
+    azure_service: AzureOpenAIService = Depends(get_azure_service),
+):
+    """Get the status of a video generation job.
+
+    With `wait` set, the response is held until the status changes or the
+    wait elapses, so clients don't need a tight polling interval.
+    """
+    status = await azure_service.get_video_status(video_id)
     if not status:
         raise HTTPException(status_code=404, detail="Video job not found")
+    if wait and status.status not in ("completed", "failed"):
+        status = await azure_service.wait_for_update(video_id, wait) or status
     return status
 
 
-@app.get("/health")
+@app.websocket("/ws/status/{video_id}")
+async def video_status_ws(websocket: WebSocket, video_id: str):
+    """Push status updates for a video job over a WebSocket."""
+    azure_service = websocket.app.state.azure_service
+    await websocket.accept()
+    status = await azure_service.get_video_status(video_id)
+    if not status:
+        await websocket.close(code=1008, reason="Video job not found")
+        return
+
+    queue = azure_service.subscribe(video_id)
+    try:
+        update = asdict(status)
+        await websocket.send_json(update)
+        while update["status"] not in ("completed", "failed"):
+            update = await queue.get()
+            await websocket.send_json(update)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        azure_service.unsubscribe(video_id, queue)
+
+
+@app.get("/health", response_model=HealthStatus)
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "service": "azure-openai-sora"}
+    return HealthStatus(status="healthy", service="azure-openai-sora")
 
 
 if __name__ == "__main__":
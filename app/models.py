@@ -1,12 +1,26 @@
 """Data models for the Azure OpenAI Sora service."""
 
+from dataclasses import dataclass
 from enum import Enum
 
 from pydantic import BaseModel, Field
 
 
 class VideoResolution(str, Enum):
-    """Video resolution options."""
+    """Video resolution options with dimensions precomputed per member."""
+
+    width: int
+    height: int
+    dims: tuple[int, int]
+
+    def __new__(cls, value: str) -> "VideoResolution":
+        member = str.__new__(cls, value)
+        member._value_ = value
+        width, height = value.split("x")
+        member.width = int(width)
+        member.height = int(height)
+        member.dims = (member.width, member.height)
+        return member
 
     RES_1920x1080 = "1920x1080"
     RES_1280x720 = "1280x720"
@@ -25,11 +39,41 @@ class VideoGenerationRequest(BaseModel):
     )
 
 
-class VideoStatus(BaseModel):
-    """Status model for video generation jobs."""
+class VideoGenerationResponse(BaseModel):
+    """Response model for a newly submitted video generation job."""
+
+    video_id: str
+    status: str
+
+
+class HealthStatus(BaseModel):
+    """Response model for the health check endpoint."""
+
+    status: str
+    service: str
+
+
+@dataclass(slots=True, frozen=True)
+class VideoStatus:
+    """Status snapshot for a video generation job.
+
+    A slotted frozen dataclass rather than a Pydantic model: instances
+    are built from trusted internal state only, so per-field validation
+    buys nothing, and __slots__ keeps the per-job footprint small.
+    Immutability means readers always see a consistent snapshot; state
+    transitions replace the stored instance instead of mutating it.
+    """
 
     video_id: str
     status: str
-    progress: int = Field(default=0, ge=0, le=100)
+    progress: int = 0
     video_url: str | None = None
     revised_prompt: str | None = None
+    error_message: str | None = None
+
+
+# Compile the core schemas at import time so the first request doesn't
+# pay for lazy schema building.
+VideoGenerationRequest.model_rebuild()
+VideoGenerationResponse.model_rebuild()
+HealthStatus.model_rebuild()
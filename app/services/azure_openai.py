@@ -1,88 +1,463 @@
 """Azure OpenAI service for video generation using Sora."""
 
 import asyncio
+import contextlib
+import hashlib
+import logging
 import os
-import uuid
+import random
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import asdict
 from typing import Any
 
-from openai import AzureOpenAI
+import orjson
 
+from ..config import get_settings
 from ..models import VideoGenerationRequest, VideoStatus
 
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(Exception):
+    """Raised when the generation queue cannot accept more jobs."""
+
+
+def _new_video_id() -> str:
+    """Return a random 128-bit job identifier as a hex string.
+
+    Same entropy as uuid4 but skips UUID object construction and dash
+    formatting on the request path.
+    """
+    return os.urandom(16).hex()
+
+
+def _request_key(request: VideoGenerationRequest) -> str:
+    """Return a stable hash identifying equivalent generation requests."""
+    raw = f"{request.prompt}|{request.resolution.value}|{request.duration}"
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
 
 class AzureOpenAIService:
     """Service for interacting with Azure OpenAI Sora API."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        *,
+        poll_backoff_min: float = 2.0,
+        poll_backoff_base: float = 1.5,
+        poll_backoff_max: float = 30.0,
+    ):
         """Initialize the Azure OpenAI service."""
-        self.client = AzureOpenAI(
-            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-            api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-08-01-preview"),
+        settings = get_settings()
+        self.api_key = settings.azure_openai_api_key or ""
+        self.azure_endpoint = settings.azure_openai_endpoint or ""
+        self.api_version = settings.azure_openai_api_version
+        # Precomputed once; the poll loop reuses these every iteration
+        self._base_url = self.azure_endpoint.rstrip("/")
+        self._default_params = {"api-version": self.api_version}
+        self.poll_backoff_min = poll_backoff_min
+        self.poll_backoff_base = poll_backoff_base
+        self.poll_backoff_max = poll_backoff_max
+        # Single long-lived client shared by job submission and polling so
+        # every request reuses the same keep-alive connection instead of
+        # paying a TLS handshake per poll. Created in startup() so it is
+        # bound to the running event loop rather than whichever loop (if
+        # any) existed at construction time.
+        self._http = None
+        self._cleanup_task: asyncio.Task | None = None
+        # Optional Redis mirror of the job store so /status works across
+        # workers; the in-process store stays authoritative for this worker
+        self.redis_url = settings.redis_url
+        self._redis = None
+        # Insertion-ordered store so the oldest jobs can be evicted in O(1)
+        self.video_jobs: OrderedDict[str, VideoStatus] = OrderedDict()
+        self.max_stored_jobs = settings.max_stored_jobs
+        self.job_cleanup_interval = settings.job_cleanup_interval
+        self.job_ttl_seconds = settings.job_ttl_seconds
+        self._lock = asyncio.Lock()
+        # Monotonic deadlines for jobs in a terminal state; entries without
+        # a deadline (pending/processing) never expire by TTL
+        self._expiry: dict[str, float] = {}
+        # Cap on jobs talking to Azure at once; the rest wait their turn,
+        # up to a bounded queue depth
+        self._semaphore = asyncio.Semaphore(settings.max_concurrent_jobs)
+        self.max_queued_jobs = settings.max_queued_jobs
+        self._waiting = 0
+        # Per-job queues feeding WebSocket subscribers with status updates
+        self._subscribers: defaultdict[str, list[asyncio.Queue]] = defaultdict(list)
+        # Strong references to in-flight generation tasks; without them the
+        # event loop only holds tasks weakly and failures go unreported
+        self._pending: set[asyncio.Task] = set()
+        # In-flight request keys -> video_id, so identical requests share
+        # one Sora job instead of paying for a duplicate
+        self._inflight: dict[str, str] = {}
+        # Per-job events pulsed on every status transition; long-polling
+        # readers wait on these instead of re-requesting on an interval
+        self._events: dict[str, asyncio.Event] = {}
+
+    async def startup(self) -> None:
+        """Create loop-bound resources: the HTTP client and cleanup task."""
+        # Deferred import: httpx is only needed once the service starts,
+        # keeping `import app.main` cheap for tools that never call Sora
+        import httpx
+
+        self._http = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            base_url=self._base_url,
+            headers={"Api-key": self.api_key},
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
         )
-        self.video_jobs: dict[str, VideoStatus] = {}
+        self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+        if self.redis_url:
+            # Deferred import: redis-py is only required when a shared
+            # store is actually configured
+            import redis.asyncio as redis
+
+            self._redis = redis.from_url(self.redis_url, decode_responses=True)
+
+    async def shutdown(self) -> None:
+        """Cancel background work and close the shared HTTP client."""
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._cleanup_task
+            self._cleanup_task = None
+        for task in list(self._pending):
+            task.cancel()
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
 
     async def generate_video(self, request: VideoGenerationRequest) -> str:
         """Generate a video asynchronously."""
-        video_id = str(uuid.uuid4())
+        # An identical request already being generated shares its job
+        # instead of starting (and paying for) a duplicate Sora call
+        key = _request_key(request)
+        existing = self._inflight.get(key)
+        if existing is not None:
+            logger.info("Coalescing duplicate request into job %s", existing)
+            return existing
 
-        # Create initial job status
-        self.video_jobs[video_id] = VideoStatus(
-            video_id=video_id, status="pending", progress=0
-        )
+        if self._waiting >= self.max_queued_jobs:
+            raise JobQueueFullError(
+                "Too many queued video generation jobs; try again later"
+            )
+
+        video_id = _new_video_id()
+
+        # Lazy %-formatting plus a level gate so the prompt slice is only
+        # taken when INFO logs are actually emitted
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Starting video generation %s: %s", video_id, request.prompt[:50]
+            )
 
-        # Start async generation
-        asyncio.create_task(self._generate_video_async(request, video_id))
+        # Create initial job status, evicting the oldest jobs if over bound
+        async with self._lock:
+            await self._store(
+                video_id,
+                VideoStatus(
+                    video_id=video_id,
+                    status="pending",
+                    progress=0,
+                    video_url=None,
+                    revised_prompt=None,
+                ),
+            )
+            self.cleanup_old_jobs()
+
+        # Start async generation, keeping a handle so the task can't be
+        # garbage collected mid-flight and failures are surfaced
+        self._inflight[key] = video_id
+        task = asyncio.create_task(self._generate_video_async(request, video_id))
+        task.add_done_callback(self._on_task_done)
+        # Once the job settles, identical requests should run fresh again
+        task.add_done_callback(lambda _task: self._inflight.pop(key, None))
+        self._pending.add(task)
 
         return video_id
 
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        """Drop a finished generation task and report any unhandled error."""
+        self._pending.discard(task)
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            logger.error("Video generation task failed", exc_info=exc)
+
+    def subscribe(self, video_id: str) -> asyncio.Queue:
+        """Register a queue that receives status updates for a job."""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers[video_id].append(queue)
+        return queue
+
+    def unsubscribe(self, video_id: str, queue: asyncio.Queue) -> None:
+        """Remove a previously registered subscriber queue."""
+        queues = self._subscribers.get(video_id)
+        if queues and queue in queues:
+            queues.remove(queue)
+            if not queues:
+                del self._subscribers[video_id]
+
+    async def _store(self, video_id: str, status: VideoStatus) -> None:
+        """Store a status snapshot, push it to subscribers, mirror to Redis."""
+        self.video_jobs[video_id] = status
+        if video_id in self._subscribers:
+            payload = asdict(status)
+            for queue in self._subscribers[video_id]:
+                queue.put_nowait(payload)
+        if self._redis is not None:
+            await self._redis.set(
+                f"video:{video_id}",
+                orjson.dumps(asdict(status)),
+                ex=int(self.job_ttl_seconds),
+            )
+        # Pulse the transition event: set() wakes every current waiter,
+        # clear() re-arms it for the next transition
+        event = self._events.get(video_id)
+        if event is not None:
+            event.set()
+            event.clear()
+
+    async def wait_for_update(
+        self, video_id: str, timeout: float
+    ) -> VideoStatus | None:
+        """Wait until the job's status changes or the timeout elapses.
+
+        Returns the job's status afterwards either way, so long-polling
+        callers always get the freshest snapshot available.
+        """
+        event = self._events.setdefault(video_id, asyncio.Event())
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(event.wait(), timeout)
+        return await self.get_video_status(video_id)
+
     async def _generate_video_async(
         self, request: VideoGenerationRequest, video_id: str
     ) -> None:
         """Generate video asynchronously in background."""
+        # Count this job as waiting until it holds a generation slot, and
+        # surface the wait to pollers when all slots are busy
+        self._waiting += 1
+        if self._semaphore.locked():
+            await self._store(
+                video_id,
+                VideoStatus(
+                    video_id=video_id,
+                    status="queued",
+                    progress=0,
+                    video_url=None,
+                    revised_prompt=None,
+                ),
+            )
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
         try:
             # Update status to processing
-            self.video_jobs[video_id].status = "processing"
-            self.video_jobs[video_id].progress = 25
+            await self._store(
+                video_id,
+                VideoStatus(
+                    video_id=video_id,
+                    status="processing",
+                    progress=25,
+                    video_url=None,
+                    revised_prompt=None,
+                ),
+            )
 
             # Call Sora API
-            result = self._call_sora_api(request)
+            result = await self._call_sora_api(request)
 
-            # Update with results
-            self.video_jobs[video_id].status = "completed"
-            self.video_jobs[video_id].progress = 100
-            self.video_jobs[video_id].video_url = result.get("video_url")
-            self.video_jobs[video_id].revised_prompt = result.get("revised_prompt")
+            # Update with results; both keys are contractually present
+            await self._store(
+                video_id,
+                VideoStatus(
+                    video_id=video_id,
+                    status="completed",
+                    progress=100,
+                    video_url=result["video_url"],
+                    revised_prompt=result["revised_prompt"],
+                ),
+            )
+            self._expiry[video_id] = time.monotonic() + self.job_ttl_seconds
 
         except Exception as e:
-            self.video_jobs[video_id].status = "failed"
-            self.video_jobs[video_id].progress = 0
-            raise e
-
-    def _call_sora_api(self, request: VideoGenerationRequest) -> dict[str, Any]:
-        """Call the Sora API for video generation."""
-        response = self.client.videos.generate(
-            model="sora",
-            prompt=request.prompt,
-            size=request.resolution.value,
-            duration=request.duration,
+            # No awaiter to re-raise to: log here and let the "failed"
+            # status (with a bounded error message) carry the diagnostics
+            logger.exception("Sora generation failed for %s", video_id)
+            await self._store(
+                video_id,
+                VideoStatus(
+                    video_id=video_id,
+                    status="failed",
+                    progress=0,
+                    video_url=None,
+                    revised_prompt=None,
+                    error_message=str(e)[:500],
+                ),
+            )
+            self._expiry[video_id] = time.monotonic() + self.job_ttl_seconds
+        finally:
+            self._semaphore.release()
+
+    def _require_credentials(self) -> None:
+        """Raise a clear error if Azure credentials are not configured."""
+        if not self.api_key or not self.azure_endpoint:
+            raise RuntimeError(
+                "Azure OpenAI credentials are not configured; set "
+                "AZURE_OPENAI_API_KEY and AZURE_OPENAI_ENDPOINT"
+            )
+
+    async def _call_sora_api(self, request: VideoGenerationRequest) -> dict[str, Any]:
+        """Submit a Sora generation job and wait for it to complete."""
+        self._require_credentials()
+        width, height = request.resolution.dims
+        payload = {
+            "model": "sora",
+            "prompt": request.prompt,
+            "width": width,
+            "height": height,
+            "n_seconds": request.duration,
+        }
+
+        logger.debug("Submitting Sora job with payload: %s", payload)
+        response = await self._http.post(
+            "/openai/v1/video/generations/jobs",
+            json=payload,
+            params=self._default_params,
         )
+        response.raise_for_status()
+        job_id = orjson.loads(response.content)["id"]
+        logger.info("Sora job %s submitted", job_id)
+
+        job = await self._poll_job_completion(job_id)
 
-        video_data = response.data[0]
+        generation = job["generations"][0]
+        video_url = (
+            f"{self._base_url}/openai/v1/video/generations/"
+            f"{generation['id']}/content/video?api-version={self.api_version}"
+        )
         return {
-            "video_url": video_data.url,
-            "revised_prompt": video_data.revised_prompt,
+            "video_url": video_url,
+            "revised_prompt": generation.get("prompt"),
         }
 
-    def get_video_status(self, video_id: str) -> VideoStatus | None:
+    async def _poll_job_completion(
+        self, job_id: str, timeout: float = 600.0
+    ) -> dict[str, Any]:
+        """Poll a generation job until it reaches a terminal state.
+
+        Polls with jittered exponential backoff against a total elapsed-time
+        budget, honoring any Retry-After header the API sends.
+        """
+        start = time.monotonic()
+        delay = self.poll_backoff_min
+        # Build the job URL once rather than on every iteration
+        poll_url = f"/openai/v1/video/generations/jobs/{job_id}"
+        while True:
+            response = await self._http.get(poll_url, params=self._default_params)
+            response.raise_for_status()
+            # orjson decodes these small payloads several times faster
+            # than the stdlib decoder behind response.json()
+            job = orjson.loads(response.content)
+
+            if job["status"] == "succeeded":
+                return job
+            if job["status"] in ("failed", "cancelled"):
+                raise RuntimeError(f"Video generation job {job_id} {job['status']}")
+            if time.monotonic() - start >= timeout:
+                raise TimeoutError(
+                    f"Video generation job {job_id} did not complete in time"
+                )
+
+            # Prefer the server-directed interval; otherwise back off with
+            # +/-10% jitter so concurrent jobs don't poll in lockstep
+            retry_after = response.headers.get("Retry-After")
+            try:
+                sleep_for = (
+                    float(retry_after)
+                    if retry_after
+                    else delay * random.uniform(0.9, 1.1)
+                )
+            except ValueError:
+                sleep_for = delay * random.uniform(0.9, 1.1)
+            await asyncio.sleep(sleep_for)
+            delay = min(delay * self.poll_backoff_base, self.poll_backoff_max)
+
+    async def get_video_status(self, video_id: str) -> VideoStatus | None:
         """Get the status of a video generation job."""
-        return self.video_jobs.get(video_id)
-
-    def cleanup_old_jobs(self, max_jobs: int = 50) -> None:
-        """Clean up old video jobs to prevent memory issues."""
-        if len(self.video_jobs) > max_jobs:
-            # Keep only the most recent jobs
-            sorted_jobs = sorted(self.video_jobs.items(), key=lambda x: x[0])
-            jobs_to_keep = dict(sorted_jobs[-max_jobs:])
-            self.video_jobs.clear()
-            self.video_jobs.update(jobs_to_keep)
+        status = self.video_jobs.get(video_id)
+        if status is None:
+            # A worker that didn't accept the job can still answer from
+            # the shared store; Redis TTL handles expiry there
+            if self._redis is not None:
+                raw = await self._redis.get(f"video:{video_id}")
+                if raw is not None:
+                    return VideoStatus(**orjson.loads(raw))
+            return None
+        # Lazily drop entries whose TTL has elapsed
+        expires_at = self._expiry.get(video_id)
+        if expires_at is not None and time.monotonic() > expires_at:
+            del self.video_jobs[video_id]
+            del self._expiry[video_id]
+            self._events.pop(video_id, None)
+            return None
+        # Refresh recency so eviction targets least recently used jobs
+        self.video_jobs.move_to_end(video_id)
+        return status
+
+    async def _cleanup_loop(self) -> None:
+        """Periodically evict expired and overflowing jobs in the background."""
+        while True:
+            await asyncio.sleep(self.job_cleanup_interval)
+            async with self._lock:
+                self._evict_expired()
+                self.cleanup_old_jobs()
+
+    def _evict_expired(self) -> None:
+        """Drop terminal jobs whose TTL has elapsed."""
+        now = time.monotonic()
+        expired = [vid for vid, deadline in self._expiry.items() if now > deadline]
+        for video_id in expired:
+            self.video_jobs.pop(video_id, None)
+            del self._expiry[video_id]
+            self._events.pop(video_id, None)
+
+    def cleanup_old_jobs(self, max_jobs: int | None = None) -> None:
+        """Evict jobs when the store exceeds its bound, cheapest loss first.
+
+        Completed jobs (result already delivered) are evicted before
+        failed ones (kept longer for error inspection); jobs that are
+        still pending, queued or processing are never evicted — clients
+        are actively polling them and the concurrency and queue caps
+        bound how many can exist. Within each tier the least recently
+        used entries go first, courtesy of the OrderedDict's recency
+        order.
+        """
+        if max_jobs is None:
+            max_jobs = self.max_stored_jobs
+        excess = len(self.video_jobs) - max_jobs
+        for target_status in ("completed", "failed"):
+            if excess <= 0:
+                return
+            victims = [
+                video_id
+                for video_id, status in self.video_jobs.items()
+                if status.status == target_status
+            ][:excess]
+            for video_id in victims:
+                del self.video_jobs[video_id]
+                self._expiry.pop(video_id, None)
+                self._events.pop(video_id, None)
+            excess -= len(victims)
@@ -4,6 +4,8 @@ from unittest.mock import patch
 
 import pytest
 
+from app.config import get_settings
+
 
 @pytest.fixture
 def mock_env_vars():
@@ -16,4 +18,7 @@ def mock_env_vars():
             "AZURE_OPENAI_API_VERSION": "2024-08-01-preview",
         },
     ):
+        # Drop any settings cached from a previous environment
+        get_settings.cache_clear()
         yield
+    get_settings.cache_clear()
@@ -1,6 +1,6 @@
 """Tests for Azure OpenAI service."""
 
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -8,16 +8,26 @@ from app.models import VideoGenerationRequest, VideoResolution
 from app.services.azure_openai import AzureOpenAIService
 
 
+def make_response(json_data, status_code=200):
+    """Create a mock httpx response with the given JSON payload."""
+    import json
+
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {}
+    response.content = json.dumps(json_data).encode()
+    response.json.return_value = json_data
+    response.raise_for_status = MagicMock()
+    return response
+
+
 @pytest.fixture
 def azure_service(mock_env_vars):
     """Create an Azure OpenAI service instance for testing."""
-    with patch("app.services.azure_openai.AzureOpenAI"):
-        service = AzureOpenAIService()
-        # Mock nested client.videos.generate for all tests
-        service.client = MagicMock()
-        service.client.videos = MagicMock()
-        service.client.videos.generate = MagicMock()
-        return service
+    service = AzureOpenAIService()
+    # Replace the shared HTTP client so no real requests are made
+    service._http = AsyncMock()
+    return service
 
 
 @pytest.mark.asyncio
@@ -29,9 +39,7 @@ async def test_generate_video_success(azure_service: AzureOpenAIService):
         duration=5,
     )
 
-    with patch.object(azure_service, "_generate_video_async") as mock_async:
-        mock_async.return_value = None
-
+    with patch.object(azure_service, "_generate_video_async", new=AsyncMock()):
         video_id = await azure_service.generate_video(request)
 
         assert video_id is not None
@@ -39,7 +47,8 @@ async def test_generate_video_success(azure_service: AzureOpenAIService):
         assert azure_service.video_jobs[video_id].status == "pending"
 
 
-def test_call_sora_api_success(azure_service: AzureOpenAIService):
+@pytest.mark.asyncio
+async def test_call_sora_api_success(azure_service: AzureOpenAIService):
     """Test successful Sora API call."""
     request = VideoGenerationRequest(
         prompt="A beautiful sunset",
@@ -47,27 +56,37 @@ def test_call_sora_api_success(azure_service: AzureOpenAIService):
         duration=5,
     )
 
-    # Mock the API response
-    mock_video_data = MagicMock()
-    mock_video_data.url = "http://example.com/video.mp4"
-    mock_video_data.revised_prompt = "A beautiful sunset over calm waters"
-
-    mock_response = MagicMock()
-    mock_response.data = [mock_video_data]
-
-    azure_service.client.videos.generate.return_value = mock_response
+    # Mock job submission followed by a completed poll response
+    azure_service._http.post.return_value = make_response({"id": "job-123"})
+    azure_service._http.get.return_value = make_response(
+        {
+            "id": "job-123",
+            "status": "succeeded",
+            "generations": [
+                {
+                    "id": "gen-456",
+                    "prompt": "A beautiful sunset over calm waters",
+                }
+            ],
+        }
+    )
 
-    result = azure_service._call_sora_api(request)
+    result = await azure_service._call_sora_api(request)
 
     assert result is not None
-    assert result["video_url"] == "http://example.com/video.mp4"
+    assert "gen-456" in result["video_url"]
     assert result["revised_prompt"] == "A beautiful sunset over calm waters"
 
-    # Verify the API was called with correct parameters
-    azure_service.client.videos.generate.assert_called_once()
+    # Verify the job was submitted with the parsed resolution
+    azure_service._http.post.assert_called_once()
+    payload = azure_service._http.post.call_args.kwargs["json"]
+    assert payload["width"] == 1920
+    assert payload["height"] == 1080
+    assert payload["n_seconds"] == 5
 
 
-def test_call_sora_api_failure(azure_service: AzureOpenAIService):
+@pytest.mark.asyncio
+async def test_call_sora_api_failure(azure_service: AzureOpenAIService):
     """Test Sora API call failure."""
     request = VideoGenerationRequest(
         prompt="A beautiful sunset",
@@ -76,13 +95,229 @@ def test_call_sora_api_failure(azure_service: AzureOpenAIService):
     )
 
     # Mock API exception
-    azure_service.client.videos.generate.side_effect = Exception("API Error")
+    azure_service._http.post.side_effect = Exception("API Error")
 
     with pytest.raises(Exception, match="API Error"):
-        azure_service._call_sora_api(request)
+        await azure_service._call_sora_api(request)
+
+
+@pytest.mark.asyncio
+async def test_poll_job_completion_failed_job(azure_service: AzureOpenAIService):
+    """Test polling a job that ends in a failed state."""
+    azure_service._http.get.return_value = make_response(
+        {"id": "job-123", "status": "failed"}
+    )
+
+    with pytest.raises(RuntimeError, match="failed"):
+        await azure_service._poll_job_completion("job-123")
+
+
+@pytest.mark.asyncio
+async def test_poll_job_completion_honors_retry_after(
+    azure_service: AzureOpenAIService,
+):
+    """Test that the poll loop sleeps for the Retry-After interval."""
+    running = make_response({"id": "job-123", "status": "running"})
+    running.headers = {"Retry-After": "7"}
+    succeeded = make_response(
+        {"id": "job-123", "status": "succeeded", "generations": [{"id": "gen-1"}]}
+    )
+    azure_service._http.get.side_effect = [running, succeeded]
+
+    with patch(
+        "app.services.azure_openai.asyncio.sleep", new=AsyncMock()
+    ) as mock_sleep:
+        job = await azure_service._poll_job_completion("job-123")
+
+    assert job["status"] == "succeeded"
+    mock_sleep.assert_awaited_once_with(7.0)
+
+
+@pytest.mark.asyncio
+async def test_poll_job_completion_backoff_with_jitter(
+    azure_service: AzureOpenAIService,
+):
+    """Test that poll delays grow exponentially within jitter bounds."""
+    running = make_response({"id": "job-123", "status": "running"})
+    succeeded = make_response(
+        {"id": "job-123", "status": "succeeded", "generations": [{"id": "gen-1"}]}
+    )
+    azure_service._http.get.side_effect = [running, running, succeeded]
+
+    with patch(
+        "app.services.azure_openai.asyncio.sleep", new=AsyncMock()
+    ) as mock_sleep:
+        await azure_service._poll_job_completion("job-123")
+
+    delays = [call.args[0] for call in mock_sleep.await_args_list]
+    assert len(delays) == 2
+    # First delay jitters around poll_backoff_min, second around min * base
+    assert 0.9 * azure_service.poll_backoff_min <= delays[0]
+    assert delays[0] <= 1.1 * azure_service.poll_backoff_min
+    expected = azure_service.poll_backoff_min * azure_service.poll_backoff_base
+    assert 0.9 * expected <= delays[1] <= 1.1 * expected
+
+
+@pytest.mark.asyncio
+async def test_generate_video_rejects_when_queue_full(
+    azure_service: AzureOpenAIService,
+):
+    """Test that a saturated queue rejects new jobs with a clear error."""
+    from app.services.azure_openai import JobQueueFullError
+
+    request = VideoGenerationRequest(prompt="A beautiful sunset")
+    azure_service._waiting = azure_service.max_queued_jobs
+
+    with pytest.raises(JobQueueFullError):
+        await azure_service.generate_video(request)
+
+
+@pytest.mark.asyncio
+async def test_failed_generation_records_error_without_raising(
+    azure_service: AzureOpenAIService,
+):
+    """Test that a failed job stores the error instead of re-raising."""
+    request = VideoGenerationRequest(prompt="A beautiful sunset")
+
+    with patch.object(
+        azure_service,
+        "_call_sora_api",
+        new=AsyncMock(side_effect=RuntimeError("Azure API exploded")),
+    ):
+        # Must not raise: there is no awaiter for the background task
+        await azure_service._generate_video_async(request, "fail-id")
+
+    status = azure_service.video_jobs["fail-id"]
+    assert status.status == "failed"
+    assert status.error_message == "Azure API exploded"
+
+
+@pytest.mark.asyncio
+async def test_duplicate_requests_share_one_job(azure_service: AzureOpenAIService):
+    """Test that identical in-flight requests coalesce into a single job."""
+    import asyncio
 
+    request = VideoGenerationRequest(prompt="A beautiful sunset")
+    other = VideoGenerationRequest(prompt="A stormy sea")
 
-def test_get_video_status_existing(azure_service: AzureOpenAIService):
+    with patch.object(azure_service, "_generate_video_async", new=AsyncMock()):
+        first = await azure_service.generate_video(request)
+        second = await azure_service.generate_video(request)
+        third = await azure_service.generate_video(other)
+
+        assert first == second
+        assert third != first
+        assert len(azure_service.video_jobs) == 2
+
+        # Once the shared task settles, an identical request runs fresh
+        await asyncio.gather(*azure_service._pending, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert not azure_service._inflight
+
+
+@pytest.mark.asyncio
+async def test_startup_and_shutdown_lifecycle(mock_env_vars):
+    """Test that startup creates loop-bound resources and shutdown releases them."""
+    service = AzureOpenAIService()
+    assert service._http is None
+
+    await service.startup()
+    assert service._http is not None
+    assert service._cleanup_task is not None
+
+    await service.shutdown()
+    assert service._http is None
+    assert service._cleanup_task is None
+
+
+@pytest.mark.asyncio
+async def test_generation_task_is_tracked_and_reaped(
+    azure_service: AzureOpenAIService, caplog
+):
+    """Test that failing background tasks are reported and dropped."""
+    import asyncio
+    import logging
+
+    request = VideoGenerationRequest(prompt="A beautiful sunset")
+
+    with patch.object(
+        azure_service,
+        "_generate_video_async",
+        new=AsyncMock(side_effect=RuntimeError("boom")),
+    ):
+        with caplog.at_level(logging.ERROR, logger="app.services.azure_openai"):
+            await azure_service.generate_video(request)
+            assert len(azure_service._pending) == 1
+            await asyncio.gather(*azure_service._pending, return_exceptions=True)
+            # Give the done-callback a turn of the loop to run
+            await asyncio.sleep(0)
+
+    assert not azure_service._pending
+    assert "Video generation task failed" in caplog.text
+
+
+def test_new_video_id_format_and_uniqueness():
+    """Test that generated job identifiers are 32-char hex and unique."""
+    from app.services.azure_openai import _new_video_id
+
+    ids = {_new_video_id() for _ in range(100)}
+    assert len(ids) == 100
+    for video_id in ids:
+        assert len(video_id) == 32
+        int(video_id, 16)  # raises if not hex
+
+
+def test_sora_call_path_is_async():
+    """Regression test: the Sora call path must not block the event loop."""
+    import inspect
+
+    import app.services.azure_openai as service_module
+
+    assert inspect.iscoroutinefunction(AzureOpenAIService._call_sora_api)
+    assert inspect.iscoroutinefunction(AzureOpenAIService._poll_job_completion)
+    assert inspect.iscoroutinefunction(AzureOpenAIService._generate_video_async)
+    # Waiting must go through asyncio.sleep, never a blocking sleep
+    assert "time.sleep" not in inspect.getsource(service_module)
+
+
+@pytest.mark.asyncio
+async def test_call_sora_api_without_credentials():
+    """Test that a missing configuration fails with a clear error."""
+    from app.config import get_settings
+
+    request = VideoGenerationRequest(prompt="A beautiful sunset")
+
+    with patch.dict("os.environ", {}, clear=True):
+        get_settings.cache_clear()
+        service = AzureOpenAIService()
+        with pytest.raises(RuntimeError, match="credentials are not configured"):
+            await service._call_sora_api(request)
+    get_settings.cache_clear()
+
+
+def test_resolution_dimensions_precomputed():
+    """Test that enum members carry their parsed dimensions."""
+    assert VideoResolution.RES_1920x1080.width == 1920
+    assert VideoResolution.RES_1920x1080.height == 1080
+    assert VideoResolution.RES_1080x1920.width == 1080
+    assert VideoResolution.RES_1080x1920.height == 1920
+    assert VideoResolution.RES_1280x720.dims == (1280, 720)
+
+
+def test_video_status_is_immutable():
+    """Test that VideoStatus snapshots cannot be mutated in place."""
+    from dataclasses import FrozenInstanceError
+
+    from app.models import VideoStatus
+
+    status = VideoStatus(video_id="test-id", status="pending", progress=0)
+
+    with pytest.raises(FrozenInstanceError):
+        status.progress = 50
+
+
+@pytest.mark.asyncio
+async def test_get_video_status_existing(azure_service: AzureOpenAIService):
     """Test getting status for existing video job."""
     from app.models import VideoStatus
 
@@ -90,7 +325,7 @@ def test_get_video_status_existing(azure_service: AzureOpenAIService):
 
     azure_service.video_jobs["test-id"] = test_status
 
-    result = azure_service.get_video_status("test-id")
+    result = await azure_service.get_video_status("test-id")
 
     assert result == test_status
     assert result.video_id == "test-id"
@@ -98,12 +333,63 @@ def test_get_video_status_existing(azure_service: AzureOpenAIService):
     assert result.progress == 50
 
 
-def test_get_video_status_non_existent(azure_service: AzureOpenAIService):
+@pytest.mark.asyncio
+async def test_get_video_status_non_existent(azure_service: AzureOpenAIService):
     """Test getting status for non-existent video job."""
-    result = azure_service.get_video_status("non-existent-id")
+    result = await azure_service.get_video_status("non-existent-id")
     assert result is None
 
 
+@pytest.mark.asyncio
+async def test_get_video_status_refreshes_recency(azure_service: AzureOpenAIService):
+    """Test that reading a job's status protects it from eviction."""
+    from app.models import VideoStatus
+
+    for i in range(3):
+        job_id = f"job-{i}"
+        azure_service.video_jobs[job_id] = VideoStatus(
+            video_id=job_id, status="completed", progress=100
+        )
+
+    # Touch the oldest job, then evict down to two entries
+    await azure_service.get_video_status("job-0")
+    azure_service.cleanup_old_jobs(max_jobs=2)
+
+    assert "job-0" in azure_service.video_jobs
+    assert "job-1" not in azure_service.video_jobs
+
+
+@pytest.mark.asyncio
+async def test_get_video_status_expired_job(azure_service: AzureOpenAIService):
+    """Test that a terminal job past its TTL is dropped on access."""
+    from app.models import VideoStatus
+
+    azure_service.video_jobs["old-id"] = VideoStatus(
+        video_id="old-id", status="completed", progress=100
+    )
+    azure_service._expiry["old-id"] = 0.0  # already expired
+
+    assert await azure_service.get_video_status("old-id") is None
+    assert "old-id" not in azure_service.video_jobs
+    assert "old-id" not in azure_service._expiry
+
+
+def test_evict_expired_sweeps_terminal_jobs(azure_service: AzureOpenAIService):
+    """Test the periodic sweep drops only expired entries."""
+    from app.models import VideoStatus
+
+    for job_id, expired in (("done-1", True), ("done-2", False)):
+        azure_service.video_jobs[job_id] = VideoStatus(
+            video_id=job_id, status="completed", progress=100
+        )
+        azure_service._expiry[job_id] = 0.0 if expired else float("inf")
+
+    azure_service._evict_expired()
+
+    assert "done-1" not in azure_service.video_jobs
+    assert "done-2" in azure_service.video_jobs
+
+
 def test_cleanup_old_jobs(azure_service: AzureOpenAIService):
     """Test cleanup of old video jobs."""
     from app.models import VideoStatus
@@ -122,3 +408,147 @@ def test_cleanup_old_jobs(azure_service: AzureOpenAIService):
 
     # Should keep only 50 most recent jobs
     assert len(azure_service.video_jobs) == 50
+
+
+def test_cleanup_evicts_by_insertion_order_not_key_order(
+    azure_service: AzureOpenAIService,
+):
+    """Regression test: eviction must drop the oldest-inserted jobs.
+
+    Job identifiers are random hex, so sorting by key (as an older
+    implementation did) evicts arbitrary jobs instead of the oldest.
+    Insert ids whose lexicographic order is the reverse of their
+    insertion order to tell the two strategies apart.
+    """
+    from app.models import VideoStatus
+
+    # "ff" sorts last but is inserted first, "aa" sorts first, inserted last
+    for job_id in ("ff-oldest", "cc-middle", "aa-newest"):
+        azure_service.video_jobs[job_id] = VideoStatus(
+            video_id=job_id, status="completed", progress=100
+        )
+
+    azure_service.cleanup_old_jobs(max_jobs=2)
+
+    assert "ff-oldest" not in azure_service.video_jobs
+    assert list(azure_service.video_jobs) == ["cc-middle", "aa-newest"]
+
+
+@pytest.mark.asyncio
+async def test_wait_for_update_returns_on_transition(
+    azure_service: AzureOpenAIService,
+):
+    """Test that a long-poll waiter wakes as soon as the status changes."""
+    import asyncio
+
+    from app.models import VideoStatus
+
+    await azure_service._store(
+        "wait-id", VideoStatus(video_id="wait-id", status="processing", progress=25)
+    )
+
+    async def transition():
+        await asyncio.sleep(0.01)
+        await azure_service._store(
+            "wait-id",
+            VideoStatus(video_id="wait-id", status="completed", progress=100),
+        )
+
+    task = asyncio.create_task(transition())
+    status = await azure_service.wait_for_update("wait-id", timeout=1.0)
+    await task
+
+    assert status.status == "completed"
+
+
+@pytest.mark.asyncio
+async def test_wait_for_update_times_out_with_current_status(
+    azure_service: AzureOpenAIService,
+):
+    """Test that an elapsed wait still returns the latest snapshot."""
+    from app.models import VideoStatus
+
+    await azure_service._store(
+        "wait-id", VideoStatus(video_id="wait-id", status="processing", progress=25)
+    )
+
+    status = await azure_service.wait_for_update("wait-id", timeout=0.01)
+
+    assert status is not None
+    assert status.status == "processing"
+
+
+def test_cleanup_prefers_completed_over_failed_and_spares_active(
+    azure_service: AzureOpenAIService,
+):
+    """Test that eviction drops completed jobs first and never active ones."""
+    from app.models import VideoStatus
+
+    for job_id, job_status in (
+        ("active-1", "processing"),
+        ("failed-1", "failed"),
+        ("done-1", "completed"),
+        ("active-2", "pending"),
+        ("done-2", "completed"),
+    ):
+        azure_service.video_jobs[job_id] = VideoStatus(
+            video_id=job_id, status=job_status, progress=0
+        )
+
+    # Over bound by two: both completed jobs go before any failed job
+    azure_service.cleanup_old_jobs(max_jobs=3)
+    assert set(azure_service.video_jobs) == {"active-1", "failed-1", "active-2"}
+
+    # Over bound by one more: the failed job is next
+    azure_service.cleanup_old_jobs(max_jobs=2)
+    assert set(azure_service.video_jobs) == {"active-1", "active-2"}
+
+    # Only active jobs left: eviction leaves them alone even over bound
+    azure_service.cleanup_old_jobs(max_jobs=1)
+    assert set(azure_service.video_jobs) == {"active-1", "active-2"}
+
+
+@pytest.mark.asyncio
+async def test_store_mirrors_status_to_redis(azure_service: AzureOpenAIService):
+    """Test that stored snapshots are written through to Redis with a TTL."""
+    import json
+
+    from app.models import VideoStatus
+
+    azure_service._redis = AsyncMock()
+
+    await azure_service._store(
+        "redis-id", VideoStatus(video_id="redis-id", status="completed", progress=100)
+    )
+
+    azure_service._redis.set.assert_awaited_once()
+    args, kwargs = azure_service._redis.set.await_args
+    assert args[0] == "video:redis-id"
+    assert json.loads(args[1])["status"] == "completed"
+    assert kwargs["ex"] == int(azure_service.job_ttl_seconds)
+
+
+@pytest.mark.asyncio
+async def test_get_video_status_falls_back_to_redis(
+    azure_service: AzureOpenAIService,
+):
+    """Test that a local miss is answered from the shared Redis store."""
+    import json
+
+    azure_service._redis = AsyncMock()
+    azure_service._redis.get.return_value = json.dumps(
+        {
+            "video_id": "remote-id",
+            "status": "processing",
+            "progress": 25,
+            "video_url": None,
+            "revised_prompt": None,
+        }
+    )
+
+    status = await azure_service.get_video_status("remote-id")
+
+    azure_service._redis.get.assert_awaited_once_with("video:remote-id")
+    assert status is not None
+    assert status.status == "processing"
+    assert status.progress == 25
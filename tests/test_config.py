@@ -0,0 +1,45 @@
+"""Tests for application settings."""
+
+from app.config import _load_env_file, get_settings
+
+
+def test_get_settings_reads_environment(mock_env_vars):
+    """Test that settings are populated from environment variables."""
+    settings = get_settings()
+
+    assert settings.azure_openai_api_key == "test-api-key"
+    assert settings.azure_openai_endpoint == "https://test.openai.azure.com/"
+    assert settings.azure_openai_api_version == "2024-08-01-preview"
+
+
+def test_get_settings_is_cached(mock_env_vars):
+    """Test that repeated calls return the same cached instance."""
+    assert get_settings() is get_settings()
+
+
+def test_load_env_file_parses_entries(tmp_path):
+    """Test .env file parsing with comments and quoted values."""
+    env_file = tmp_path / ".env"
+    env_file.write_text(
+        "# comment line\n"
+        "AZURE_OPENAI_API_KEY=secret\n"
+        'AZURE_OPENAI_ENDPOINT="https://example.openai.azure.com/"\n'
+        "\n"
+        "not a valid line\n"
+    )
+
+    _load_env_file.cache_clear()
+    values = _load_env_file(str(env_file))
+
+    assert values == {
+        "AZURE_OPENAI_API_KEY": "secret",
+        "AZURE_OPENAI_ENDPOINT": "https://example.openai.azure.com/",
+    }
+    _load_env_file.cache_clear()
+
+
+def test_load_env_file_missing_file():
+    """Test that a missing .env file yields no values."""
+    _load_env_file.cache_clear()
+    assert _load_env_file("does-not-exist.env") == {}
+    _load_env_file.cache_clear()
@@ -1,7 +1,6 @@
 """Tests for FastAPI application."""
 
 import warnings
-from unittest.mock import patch
 
 import pytest
 from fastapi.testclient import TestClient
@@ -12,8 +11,8 @@ from app.main import app
 @pytest.fixture
 def client(mock_env_vars):
     """Create a test client for the FastAPI app."""
-    with patch("app.services.azure_openai.AzureOpenAI"):
-        return TestClient(app)
+    with TestClient(app) as client:
+        yield client
 
 
 def test_health_endpoint(client):
@@ -27,12 +26,11 @@ def test_health_endpoint(client):
 
 def test_lifespan_startup_shutdown():
     """Test that the lifespan event properly initializes and cleans up."""
-    with patch("app.services.azure_openai.AzureOpenAI"):
-        with TestClient(app) as client:
-            # The lifespan context should have initialized the service
-            response = client.get("/health")
-            assert response.status_code == 200
-            # Cleanup happens automatically when context exits
+    with TestClient(app) as client:
+        # The lifespan context should have initialized the service
+        response = client.get("/health")
+        assert response.status_code == 200
+        # Cleanup happens automatically when context exits
 
 
 def test_no_deprecation_warnings():
@@ -41,8 +39,7 @@ def test_no_deprecation_warnings():
     with warnings.catch_warnings(record=True) as w:
         warnings.simplefilter("always")
 
-        with patch("app.services.azure_openai.AzureOpenAI"):
-            TestClient(app)
+        TestClient(app)
 
         # Check that no deprecation warnings were raised for on_event
         deprecation_warnings = [
@@ -57,6 +54,25 @@ def test_no_deprecation_warnings():
         ), f"Found deprecation warnings: {[str(w.message) for w in deprecation_warnings]}"
 
 
+def test_websocket_status_snapshot(mock_env_vars):
+    """Test that the status WebSocket sends the current job state."""
+    from app.models import VideoStatus
+
+    with TestClient(app) as client:
+        client.app.state.azure_service.video_jobs["ws-test-id"] = VideoStatus(
+            video_id="ws-test-id",
+            status="completed",
+            progress=100,
+            video_url="https://example.com/video.mp4",
+        )
+
+        with client.websocket_connect("/ws/status/ws-test-id") as websocket:
+            update = websocket.receive_json()
+            assert update["video_id"] == "ws-test-id"
+            assert update["status"] == "completed"
+            assert update["progress"] == 100
+
+
 def test_app_routes_exist(client):
     """Test that all expected routes exist and return proper status codes."""
     # Health endpoint should work
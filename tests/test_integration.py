@@ -1,34 +1,36 @@
 """Integration tests for the FastAPI application."""
 
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from fastapi.testclient import TestClient
 
-from app.main import app
+from app.main import app, get_azure_service
 
 
 @pytest.fixture
 def client(mock_env_vars):
     """Create a test client for integration tests."""
-    with patch("app.services.azure_openai.AzureOpenAI"):
-        # Create a mock service instance
-        mock_service = MagicMock()
-
-        # Make the async methods return coroutines
-        async def mock_generate_video(request):
-            return "test-video-id-123"
-
-        mock_service.generate_video = mock_generate_video
-        mock_service.get_video_status = MagicMock()
-        mock_service.cleanup_old_jobs = MagicMock()
-
-        # Patch the global service at module level
-        with patch("app.main.azure_service", mock_service):
-            client = TestClient(app)
-            # Store the mock service for use in tests
-            client.mock_service = mock_service
-            yield client
+    # Create a mock service instance
+    mock_service = MagicMock()
+
+    # Make the async methods return coroutines
+    async def mock_generate_video(request):
+        return "test-video-id-123"
+
+    mock_service.generate_video = mock_generate_video
+    mock_service.get_video_status = AsyncMock()
+    mock_service.cleanup_old_jobs = MagicMock()
+
+    # Substitute the mock for the lifespan-scoped service
+    app.dependency_overrides[get_azure_service] = lambda: mock_service
+    try:
+        client = TestClient(app)
+        # Store the mock service for use in tests
+        client.mock_service = mock_service
+        yield client
+    finally:
+        app.dependency_overrides.clear()
 
 
 def test_root_endpoint_serves_web_interface(client):